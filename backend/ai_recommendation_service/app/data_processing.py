@@ -1,25 +1,80 @@
-import pandas as pd
+from typing import Dict, List
+
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
 import torch
 
+class FastMinMaxScaler:
+    """Minimal (0, 1) min-max scaler that works in place on float32 buffers."""
+    def __init__(self):
+        self.data_min = None
+        self.data_range = None
+
+    def fit(self, x):
+        x = np.asarray(x)
+        self.data_min = x.min(axis=0).astype(np.float64)
+        data_range = x.max(axis=0) - self.data_min
+        data_range[data_range == 0] = 1.0 # Constant series would otherwise divide by zero
+        self.data_range = data_range
+        return self
+
+    def transform(self, x, out=None):
+        if out is None:
+            out = np.empty(np.shape(x), dtype=np.float32)
+        np.subtract(x, self.data_min, out=out)
+        np.divide(out, self.data_range, out=out)
+        return out
+
+    def fit_transform(self, x):
+        return self.fit(x).transform(x)
+
+    def save(self, path):
+        # The whole scaler is two arrays; store them as a tiny .npz instead of pickling the object
+        np.savez(path, data_min=self.data_min, data_range=self.data_range)
+
+    @classmethod
+    def load(cls, path):
+        scaler = cls()
+        with np.load(path) as params:
+            scaler.data_min = params["data_min"]
+            scaler.data_range = params["data_range"]
+        return scaler
+
+    def inverse_transform(self, x, out=None):
+        # Keep prices in float64 on the way back out
+        if out is None:
+            out = np.empty(np.shape(x), dtype=np.float64)
+        np.multiply(x, self.data_range, out=out)
+        np.add(out, self.data_min, out=out)
+        return out
+
 class PriceDataset(torch.utils.data.Dataset):
     def __init__(self, data, sequence_length):
         self.data = data
         self.sequence_length = sequence_length
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+        self.scaler = FastMinMaxScaler()
         self.scaled_data = self.scaler.fit_transform(data.reshape(-1, 1))
+        # Expose every sliding window as one strided view over a single float32 buffer,
+        # so __getitem__ is pure indexing and memory stays O(N) rather than O(N * L)
+        flat = torch.from_numpy(np.ascontiguousarray(self.scaled_data, dtype=np.float32).reshape(-1))
+        num_windows = max(len(flat) - sequence_length, 0)
+        self.windows = flat.as_strided(size=(num_windows, sequence_length, 1), stride=(1, 1, 1))
+        self.targets = flat[sequence_length:]
 
     def __len__(self):
-        return len(self.scaled_data) - self.sequence_length
+        return len(self.windows)
 
     def __getitem__(self, idx):
-        x = self.scaled_data[idx:idx + self.sequence_length]
-        y = self.scaled_data[idx + self.sequence_length]
-        return torch.tensor(x, dtype=torch.float32), torch.tensor(y, dtype=torch.float32)
+        return self.windows[idx], self.targets[idx:idx + 1]
+
+def extract_column(rows: List[Dict], column: str, sort_key: str = "date") -> np.ndarray:
+    """Pull one numeric column out of JSON rows in `sort_key` order, without building a DataFrame."""
+    # ISO-8601 date strings sort chronologically as plain strings; only sort if the rows aren't already in order
+    if any(rows[i][sort_key] > rows[i + 1][sort_key] for i in range(len(rows) - 1)):
+        rows = sorted(rows, key=lambda row: row[sort_key])
+    return np.fromiter((row[column] for row in rows), dtype=np.float64, count=len(rows))
 
-def preprocess_data(df: pd.DataFrame, target_column: str, sequence_length: int):
-    data = df[target_column].values
+def preprocess_data(rows: List[Dict], target_column: str, sequence_length: int):
+    data = extract_column(rows, target_column)
     dataset = PriceDataset(data, sequence_length)
     return dataset, dataset.scaler
 
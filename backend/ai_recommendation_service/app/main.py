@@ -1,35 +1,47 @@
 import os
+import tempfile
 import uuid
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 import asyncio
-from typing import List, Dict, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Iterable, Optional
 
-import httpx # Keep httpx for async operations
-import requests # Add requests for synchronous operations
+import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, Depends, Header
 from pydantic import BaseModel
 import torch
 import torch.nn as nn
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-import joblib # Import joblib for saving/loading scaler
 import numpy as np
 
-from .models import UserPublic, PortfolioHolding, Portfolio, PriceData, Recommendation, LSTMModel  # Import all necessary models
-from .data_processing import preprocess_data, inverse_transform_data
+from .models import UserPublic, Portfolio, PriceData, Recommendation, LSTMModel  # Import all necessary models
+from .data_processing import FastMinMaxScaler, preprocess_data, extract_column
 from .model_config import MODEL_CONFIG
+from .ttl_cache import TTLCache
+
+# Fixed (batch, sequence_length, 1) shapes let cuDNN pick the fastest LSTM kernels once
+torch.backends.cudnn.benchmark = True
 
 # --- External Service URLs ---
 CUSTOMER_SERVICE_URL = os.getenv("CUSTOMER_SERVICE_URL", "http://localhost:8001")
 PORTFOLIO_SERVICE_URL = os.getenv("PORTFOLIO_SERVICE_URL", "http://localhost:8002")
 MARKET_DATA_SERVICE_URL = os.getenv("MARKET_DATA_SERVICE_URL", "http://localhost:8003")
 
-# --- FastAPI App Initialization ---
-app = FastAPI(
-    title="AI Recommendation Service",
-    description="Analyzes user data and market data to provide investment recommendations."
+# --- Inference Settings ---
+# /predict runs on CPU; int8 dynamic quantization of the LSTM/Linear weights speeds it up at negligible accuracy cost
+QUANTIZE_PREDICT_MODELS = os.getenv("QUANTIZE_PREDICT_MODELS", "true").lower() == "true"
+
+# --- Shared HTTP client ---
+# One pooled client for all downstream calls so concurrent fan-outs reuse keep-alive connections
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(5.0),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
 )
 
+# Symbols always considered for recommendations, on top of the user's holdings
+DEFAULT_RECOMMENDATION_SYMBOLS = frozenset(["AAPL", "GOOGL", "MSFT", "BTC", "ETH"])
+
 # --- Dependencies for Authorization (Simplified) ---
 async def get_current_user_id(x_user_id: uuid.UUID = Header(..., alias="X-User-ID")) -> uuid.UUID:
     if not x_user_id:
@@ -38,57 +50,136 @@ async def get_current_user_id(x_user_id: uuid.UUID = Header(..., alias="X-User-I
 
 # --- Helper functions to fetch data from other services ---
 async def fetch_user_data(user_id: uuid.UUID, auth_header: Dict[str, str]) -> UserPublic:
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{CUSTOMER_SERVICE_URL}/users/{user_id}", headers=auth_header)
-            response.raise_for_status()
-            return UserPublic(**response.json())
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"User Service error: {e.response.text}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=500, detail=f"Network error with User Service: {e}")
+    try:
+        response = await http_client.get(f"{CUSTOMER_SERVICE_URL}/users/{user_id}", headers=auth_header)
+        response.raise_for_status()
+        return UserPublic(**response.json())
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"User Service error: {e.response.text}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Network error with User Service: {e}")
 
 async def fetch_portfolio_data(user_id: uuid.UUID, auth_header: Dict[str, str]) -> Portfolio:
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{PORTFOLIO_SERVICE_URL}/portfolio/{user_id}", headers=auth_header)
-            response.raise_for_status()
-            return Portfolio(**response.json())
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Portfolio Service error: {e.response.text}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=500, detail=f"Network error with Portfolio Service: {e}")
+    try:
+        response = await http_client.get(f"{PORTFOLIO_SERVICE_URL}/portfolio/{user_id}", headers=auth_header)
+        response.raise_for_status()
+        return Portfolio(**response.json())
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Portfolio Service error: {e.response.text}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Network error with Portfolio Service: {e}")
+
+# Short-lived cache so concurrent recommendation requests share one upstream fetch per symbol.
+# Symbols come from arbitrary portfolios, so it's bounded
+MARKET_DATA_CACHE_TTL = 5.0 # seconds
+MARKET_DATA_CACHE_MAXSIZE = 1024
+_market_data_cache: TTLCache[PriceData] = TTLCache(maxsize=MARKET_DATA_CACHE_MAXSIZE, ttl=MARKET_DATA_CACHE_TTL)
+_market_data_locks: Dict[str, asyncio.Lock] = {} # Only symbols with a fetch in flight
 
 async def fetch_market_data(symbol: str) -> Optional[PriceData]:
-    async with httpx.AsyncClient() as client:
+    cached = _market_data_cache.get(symbol)
+    if cached is not None:
+        return cached
+    # Single-flight: only one request per symbol goes upstream, the rest wait for its result
+    lock = _market_data_locks.setdefault(symbol, asyncio.Lock())
+    async with lock:
         try:
-            response = await client.get(f"{MARKET_DATA_SERVICE_URL}/market-data/current/{symbol}")
-            response.raise_for_status()
-            return PriceData(**response.json())
+            cached = _market_data_cache.get(symbol)
+            if cached is not None:
+                return cached
+            price_data = await _fetch_market_data_uncached(symbol)
+            if price_data is not None:
+                _market_data_cache.set(symbol, price_data)
+            return price_data
+        finally:
+            # Waiters still hold this lock and will find the result cached; later requests start afresh
+            if _market_data_locks.get(symbol) is lock:
+                del _market_data_locks[symbol]
+
+async def _fetch_market_data_uncached(symbol: str) -> Optional[PriceData]:
+    try:
+        response = await http_client.get(f"{MARKET_DATA_SERVICE_URL}/market-data/current/{symbol}")
+        response.raise_for_status()
+        return PriceData(**response.json())
+    except httpx.HTTPStatusError as e:
+        print(f"Warning: Could not fetch market data for {symbol}: {e.response.text}")
+        return None
+    except httpx.RequestError as e:
+        print(f"Warning: Network error fetching market data for {symbol}: {e}")
+        return None
+
+# The batched endpoint is feature-detected; older market data deployments only serve per-symbol lookups.
+# A 404/405 may just be a rolling deploy, so it's probed again after a while rather than given up on for good
+MARKET_DATA_BATCH_REPROBE_INTERVAL = 60.0 # seconds
+_market_data_batch_unavailable_until = 0.0 # time.monotonic() deadline
+# Cap on concurrent per-symbol requests when falling back from the batched endpoint
+MARKET_DATA_CONCURRENCY = 10
+_market_data_semaphore = asyncio.Semaphore(MARKET_DATA_CONCURRENCY)
+
+async def _fetch_market_data_bounded(symbol: str) -> Optional[PriceData]:
+    async with _market_data_semaphore:
+        return await fetch_market_data(symbol)
+
+async def fetch_market_data_batch(symbols: Iterable[str]) -> Dict[str, PriceData]:
+    """Fetch current prices for many symbols in one round-trip, keyed by symbol. Missing symbols are omitted."""
+    global _market_data_batch_unavailable_until
+    prices: Dict[str, PriceData] = {}
+    missing = []
+    for symbol in symbols:
+        cached = _market_data_cache.get(symbol)
+        if cached is not None:
+            prices[symbol] = cached
+        else:
+            missing.append(symbol)
+    if not missing:
+        return prices
+
+    if time.monotonic() >= _market_data_batch_unavailable_until:
+        try:
+            response = await http_client.get(
+                f"{MARKET_DATA_SERVICE_URL}/market-data/current",
+                params={"symbols": ",".join(missing)}
+            )
+            if response.status_code in (404, 405):
+                print("Warning: Batched market data endpoint unavailable, falling back to per-symbol requests")
+                _market_data_batch_unavailable_until = time.monotonic() + MARKET_DATA_BATCH_REPROBE_INTERVAL
+            else:
+                response.raise_for_status()
+                for symbol, data in response.json().items():
+                    price_data = PriceData(**data)
+                    _market_data_cache.set(symbol, price_data)
+                    prices[symbol] = price_data
+                return prices
         except httpx.HTTPStatusError as e:
-            print(f"Warning: Could not fetch market data for {symbol}: {e.response.text}")
-            return None
+            print(f"Warning: Could not fetch batched market data for {missing}: {e.response.text}")
+            return prices
         except httpx.RequestError as e:
-            print(f"Warning: Network error fetching market data for {symbol}: {e}")
-            return None
+            print(f"Warning: Network error fetching batched market data for {missing}: {e}")
+            return prices
+
+    # return_exceptions so one unexpected failure doesn't cancel the other lookups
+    results = await asyncio.gather(*[_fetch_market_data_bounded(s) for s in missing], return_exceptions=True)
+    prices.update({symbol: md for symbol, md in zip(missing, results) if isinstance(md, PriceData)})
+    return prices
 
-def fetch_historical_price_data(symbol: str, instrument_type: str, start_date: date, end_date: date) -> List[Dict]:
+async def fetch_historical_price_data(symbol: str, instrument_type: str, start_date: date, end_date: date) -> List[Dict]:
     try:
         # Adjust the endpoint based on how market_data_service exposes historical data
         # Assuming an endpoint like /market-data/historical/{instrument_type}/{symbol}?start_date=...&end_date=...
-        response = requests.get(
+        response = await http_client.get(
             f"{MARKET_DATA_SERVICE_URL}/market-data/historical/{symbol}",
             params={
                 "start_date": start_date.isoformat(),
                 "end_date": end_date.isoformat(),
                 "instrument_type": instrument_type
-            }
+            },
+            timeout=30.0 # Multi-year ranges may have to be pulled from the upstream provider first
         )
         response.raise_for_status()
-        return response.json()["data"]
-    except requests.exceptions.HTTPError as e:
+        return orjson.loads(response.content)["data"]
+    except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=f"Market Data Service error: {e.response.text}")
-    except requests.exceptions.RequestException as e:
+    except httpx.RequestError as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"Network error with Market Data Service: {e}")
 
@@ -140,75 +231,282 @@ async def generate_mock_recommendations(
     return recommendations
 
 # --- Internal Helper for Model Training ---
+def _model_paths(model_save_directory: str, instrument_type: str, symbol: str) -> tuple:
+    """Returns the (model_path, scaler_path) a trained model is saved to and served from."""
+    save_dir = os.path.join(model_save_directory, instrument_type)
+    return os.path.join(save_dir, f"{symbol}_lstm_model.pth"), os.path.join(save_dir, f"{symbol}_scaler.npz")
+
+# Training batch size, and the batch size that learning rates (e.g. TrainingRequest's default) are given for
+TRAIN_BATCH_SIZE = 256
+REFERENCE_BATCH_SIZE = 64
+
+# One lock per (instrument_type, symbol) so concurrent trainings of a model don't interleave their file swaps
+_TRAINING_LOCKS: Dict[tuple, asyncio.Lock] = {}
+
 async def _train_model(
     symbol: str,
     instrument_type: str,
     learning_rate: float,
     num_epochs: int,
     model_save_directory: str,
-    end_date: Optional[date] = None # New argument for specifying training end date
+    end_date: Optional[date] = None, # New argument for specifying training end date
+    only_if_missing: bool = False # Skip training if the model was saved while waiting for the lock
 ):
     model_config = MODEL_CONFIG.get(instrument_type.lower())
     if not model_config:
         raise ValueError(f"No model configuration found for instrument type: {instrument_type}")
 
-    sequence_length = model_config["sequence_length"]
-    input_size = model_config["input_size"]
-    hidden_size = model_config["hidden_size"]
-    num_layers = model_config["num_layers"]
-    output_size = model_config["output_size"]
-    dropout = model_config["dropout"]
-    
+    async with _TRAINING_LOCKS.setdefault((instrument_type, symbol), asyncio.Lock()):
+        model_path, scaler_path = _model_paths(model_save_directory, instrument_type, symbol)
+        if only_if_missing and os.path.exists(model_path) and os.path.exists(scaler_path):
+            return model_path
+        return await _train_and_save(
+            symbol, instrument_type, model_config, learning_rate, num_epochs, model_save_directory, end_date
+        )
+
+async def _train_and_save(
+    symbol: str,
+    instrument_type: str,
+    model_config: Dict,
+    learning_rate: float,
+    num_epochs: int,
+    model_save_directory: str,
+    end_date: Optional[date]
+) -> str:
     print(f"Starting internal training for {symbol} ({instrument_type}) up to {end_date if end_date else 'today'}")
     
     # Fetch historical data
     actual_end_date = end_date if end_date else date.today()
     start_date = actual_end_date - timedelta(days=365 * 5) # Fetch 5 years of data
-    historical_data_response = fetch_historical_price_data(symbol, instrument_type, start_date, actual_end_date)
+    historical_data_response = await fetch_historical_price_data(symbol, instrument_type, start_date, actual_end_date)
     
     if not historical_data_response:
         raise ValueError(f"No historical data found for {symbol} ({instrument_type}). Cannot train model.")
 
-    df = pd.DataFrame(historical_data_response)
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date')
-    
+    # The training loop is CPU/GPU-bound and synchronous; run it in a worker thread so the event loop
+    # keeps serving other requests (PyTorch releases the GIL inside its kernels)
+    return await asyncio.to_thread(
+        _train_sync,
+        symbol,
+        instrument_type,
+        historical_data_response,
+        model_config,
+        learning_rate,
+        num_epochs,
+        model_save_directory
+    )
+
+def _train_sync(
+    symbol: str,
+    instrument_type: str,
+    historical_data_response: List[Dict],
+    model_config: Dict,
+    learning_rate: float,
+    num_epochs: int,
+    model_save_directory: str
+) -> str:
+    sequence_length = model_config["sequence_length"]
+    input_size = model_config["input_size"]
+    hidden_size = model_config["hidden_size"]
+    num_layers = model_config["num_layers"]
+    output_size = model_config["output_size"]
+    dropout = model_config["dropout"]
+
     # Use 'close' price for training
-    dataset, scaler = preprocess_data(df, 'close', sequence_length)
+    dataset, scaler = preprocess_data(historical_data_response, 'close', sequence_length)
     
     if len(dataset) == 0:
         raise ValueError(f"Not enough data after preprocessing for {symbol} ({instrument_type}). Cannot train model.")
 
-    train_loader = torch.utils.data.DataLoader(dataset, batch_size=64, shuffle=True)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # The dataset is a few thousand windows over one in-memory tensor, so loading in-process (num_workers=0)
+    # beats forking workers, which would also be started from this to_thread worker thread
+    train_loader = torch.utils.data.DataLoader(
+        dataset,
+        batch_size=TRAIN_BATCH_SIZE,
+        shuffle=True,
+        num_workers=0,
+        pin_memory=device.type == "cuda",
+        drop_last=len(dataset) > TRAIN_BATCH_SIZE # Keep at least one batch for tiny datasets
+    )
 
-    model = LSTMModel(input_size, hidden_size, num_layers, output_size, dropout)
+    model = LSTMModel(input_size, hidden_size, num_layers, output_size, dropout).to(device)
     criterion = nn.MSELoss()
-    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    # 4x larger batches mean 4x fewer optimizer steps per epoch; scaling the learning rate linearly with the
+    # batch size keeps a learning rate given for the reference batch size training about as far as before
+    scaled_lr = learning_rate * TRAIN_BATCH_SIZE / REFERENCE_BATCH_SIZE
+    optimizer = torch.optim.Adam(model.parameters(), lr=scaled_lr)
+
+    # Mixed precision only pays off on GPU; on CPU autocast and the grad scaler are no-ops
+    use_amp = device.type == "cuda"
+    amp_dtype = torch.bfloat16 if use_amp and torch.cuda.is_bf16_supported() else torch.float16
+    scaler_amp = torch.cuda.amp.GradScaler(enabled=use_amp)
 
     for epoch in range(num_epochs):
         for batch_idx, (data, target) in enumerate(train_loader):
-            optimizer.zero_grad()
-            output = model(data)
-            loss = criterion(output, target)
-            loss.backward()
-            optimizer.step()
+            data = data.to(device, non_blocking=True)
+            target = target.to(device, non_blocking=True)
+            optimizer.zero_grad(set_to_none=True)
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                output = model(data)
+                loss = criterion(output, target)
+            scaler_amp.scale(loss).backward()
+            scaler_amp.step(optimizer)
+            scaler_amp.update()
         if (epoch + 1) % 10 == 0:
             print(f"Epoch {epoch+1}/{num_epochs}, Loss: {loss.item():.4f}")
 
-    # Create directory if it doesn't exist
-    save_dir = os.path.join(model_save_directory, instrument_type)
-    os.makedirs(save_dir, exist_ok=True)
-    
-    model_path = os.path.join(save_dir, f"{symbol}_lstm_model.pth")
-    scaler_path = os.path.join(save_dir, f"{symbol}_scaler.joblib") # Define scaler path
+    model_path, scaler_path = _model_paths(model_save_directory, instrument_type, symbol)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True) # Create directory if it doesn't exist
 
-    torch.save(model.state_dict(), model_path)
-    joblib.dump(scaler, scaler_path) # Save the scaler
+    # The scaler goes first: /predict reloads both files when the model file changes, so by then its scaler is in place.
+    # Always persist CPU tensors so /predict can load anywhere
+    _save_atomically(scaler.save, scaler_path)
+    _save_atomically(lambda f: torch.save(model.cpu().state_dict(), f), model_path)
 
     print(f"Model for {symbol} ({instrument_type}) trained and saved to {model_path}")
     print(f"Scaler for {symbol} ({instrument_type}) saved to {scaler_path}")
     return model_path # Return the path to the saved model
 
+def _save_atomically(save, path: str):
+    """
+    Writes a file through save(file_object) into a fresh temp file next to `path`, then swaps it in.
+    Cached models are memory-mapped from their file, so it must be replaced rather than truncated in place.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            save(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# --- In-process cache of loaded models and scalers ---
+# Keyed by (instrument_type, symbol); entries are invalidated when the .pth file's mtime changes (e.g. after retraining)
+_MODEL_CACHE: Dict[tuple, tuple] = {}
+_MODEL_LOCKS: Dict[tuple, asyncio.Lock] = {}
+
+async def _load_model(symbol: str, instrument_type: str, model_path: str, scaler_path: str, model_config: Dict):
+    key = (instrument_type, symbol)
+    # One lock per key so concurrent requests for the same model don't load it twice
+    lock = _MODEL_LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        mtime = os.stat(model_path).st_mtime
+        cached = _MODEL_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        model = LSTMModel(
+            model_config["input_size"],
+            model_config["hidden_size"],
+            model_config["num_layers"],
+            model_config["output_size"],
+            model_config["dropout"]
+        )
+        # Memory-map the checkpoint and hand its storages straight to the module instead of copying them
+        state_dict = torch.load(model_path, map_location="cpu", mmap=True, weights_only=True)
+        model.load_state_dict(state_dict, assign=True)
+        model.eval()
+        if QUANTIZE_PREDICT_MODELS:
+            model = torch.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+        try:
+            # Script and freeze the eval module once so each forward skips Python dispatch
+            model = torch.jit.freeze(torch.jit.script(model))
+        except Exception as e:
+            # Not every torch build can script every quantized module; the eager module computes the same thing
+            print(f"Warning: Could not script model for {symbol} ({instrument_type}), serving it eagerly: {e}")
+        scaler = FastMinMaxScaler.load(scaler_path)
+
+        _MODEL_CACHE[key] = (mtime, model, scaler)
+        return model, scaler
+
+# --- Micro-batching of concurrent /predict forwards ---
+class PredictBatcher:
+    """
+    Coalesces concurrent single-sequence forwards for the same model into one batched forward.
+    Each submitted (sequence_length, input_size) tensor waits at most `max_wait` seconds for company.
+    A model's worker exits after `idle_timeout` seconds without requests and is restarted on the next one.
+    """
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.005, idle_timeout: float = 60.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self._queues: Dict[tuple, asyncio.Queue] = {}
+        self._workers: Dict[tuple, asyncio.Task] = {}
+
+    async def submit(self, key: tuple, model, sequence: torch.Tensor) -> torch.Tensor:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.create_task(self._run(key, queue))
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((model, sequence, future))
+        return await future
+
+    @staticmethod
+    def _forward(model, sequences: List[torch.Tensor]) -> torch.Tensor:
+        with torch.inference_mode():
+            return model(torch.stack(sequences))
+
+    async def _run(self, key: tuple, queue: asyncio.Queue):
+        while True:
+            try:
+                items = [await asyncio.wait_for(queue.get(), self.idle_timeout)]
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    # Nothing awaits between this check and the removal, so no submit can slip in unseen
+                    del self._queues[key]
+                    del self._workers[key]
+                    return
+                continue
+            await asyncio.sleep(self.max_wait)
+            while len(items) < self.max_batch_size and not queue.empty():
+                items.append(queue.get_nowait())
+
+            # A retrain can swap the cached model mid-window, so only batch entries sharing a model
+            groups: Dict[int, tuple] = {}
+            for model, sequence, future in items:
+                groups.setdefault(id(model), (model, []))[1].append((sequence, future))
+
+            for model, entries in groups.values():
+                try:
+                    # Run the forward off the event loop so other requests keep being served meanwhile
+                    outputs = await asyncio.to_thread(self._forward, model, [sequence for sequence, _ in entries])
+                    for (_, future), output in zip(entries, outputs):
+                        if not future.done():
+                            future.set_result(output)
+                except Exception as e:
+                    for _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+
+    async def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+
+predict_batcher = PredictBatcher()
+
+# --- FastAPI Lifecycle Events ---
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    print("AI Recommendation Service started.")
+    yield
+    await predict_batcher.close()
+    await http_client.aclose()
+    print("AI Recommendation Service shutting down.")
+
+# --- FastAPI App Initialization ---
+app = FastAPI(
+    title="AI Recommendation Service",
+    description="Analyzes user data and market data to provide investment recommendations.",
+    lifespan=lifespan # Stops the batcher's workers and closes the shared HTTP client on shutdown and reload
+)
+
 # --- API Endpoints ---
 
 @app.get("/ai/")
@@ -226,19 +524,18 @@ async def get_recommendations_for_user(user_id: uuid.UUID, current_user_id: uuid
 
     auth_header = {"X-User-ID": str(user_id)} # Pass user ID in header for inter-service auth
 
-    # Fetch necessary data from other services
-    user_data = await fetch_user_data(user_id, auth_header)
-    portfolio_data = await fetch_portfolio_data(user_id, auth_header)
-
-    # Fetch market data for relevant symbols (e.g., from portfolio, or general interest)
-    symbols_to_fetch = set([h.symbol for h in portfolio_data.holdings] + ["AAPL", "GOOGL", "MSFT", "BTC", "ETH"]) # Example symbols
-    market_data_tasks = [fetch_market_data(s) for s in symbols_to_fetch]
-    market_data_results = await asyncio.gather(*market_data_tasks)
+    # Fetch user and portfolio data concurrently with market data for the default symbols,
+    # which don't depend on the portfolio
+    user_data, portfolio_data, current_market_prices = await asyncio.gather(
+        fetch_user_data(user_id, auth_header),
+        fetch_portfolio_data(user_id, auth_header),
+        fetch_market_data_batch(DEFAULT_RECOMMENDATION_SYMBOLS)
+    )
 
-    # Convert list of PriceData (some might be None) to a dictionary for easy lookup
-    current_market_prices = {
-        md.symbol: md for md in market_data_results if md is not None
-    }
+    # Then fetch market data for any held symbols not already covered, in one batched request
+    holding_symbols = {h.symbol for h in portfolio_data.holdings} - DEFAULT_RECOMMENDATION_SYMBOLS
+    if holding_symbols:
+        current_market_prices.update(await fetch_market_data_batch(holding_symbols))
 
     # Generate recommendations using mock ML logic
     recommendations = await generate_mock_recommendations(
@@ -253,7 +550,7 @@ async def get_recommendations_for_user(user_id: uuid.UUID, current_user_id: uuid
 class TrainingRequest(BaseModel):
     symbol: str
     instrument_type: str # e.g., "VN_STOCK", "VN_INDEX", "INTERNATIONAL_INDEX", "FOREX"
-    learning_rate: float = 0.001
+    learning_rate: float = 0.001 # For a batch of REFERENCE_BATCH_SIZE; scaled to TRAIN_BATCH_SIZE in training
     num_epochs: int = 100
     model_save_directory: str = "./models" # Directory to save models
     end_date: Optional[date] = None # Optional training end date
@@ -289,14 +586,8 @@ async def predict_price(request: PredictionRequest):
             raise HTTPException(status_code=400, detail=f"No model configuration found for instrument type: {request.instrument_type}")
 
         sequence_length = model_config["sequence_length"]
-        input_size = model_config["input_size"]
-        hidden_size = model_config["hidden_size"]
-        num_layers = model_config["num_layers"]
-        output_size = model_config["output_size"]
-        dropout = model_config["dropout"]
-
-        model_path = os.path.join("./models", request.instrument_type, f"{request.symbol}_lstm_model.pth")
-        scaler_path = os.path.join("./models", request.instrument_type, f"{request.symbol}_scaler.joblib")
+
+        model_path, scaler_path = _model_paths("./models", request.instrument_type, request.symbol)
         
         # If model or scaler not found, train it up to today's date
         if not os.path.exists(model_path) or not os.path.exists(scaler_path):
@@ -309,34 +600,27 @@ async def predict_price(request: PredictionRequest):
                     learning_rate=0.001, # Default learning rate for auto-training
                     num_epochs=100,      # Default epochs for auto-training
                     model_save_directory="./models",
-                    end_date=date.today() # Auto-train up to today
+                    end_date=date.today(), # Auto-train up to today
+                    only_if_missing=True # A concurrent request may already be training it
                 )
                 print(f"Training completed for {request.symbol} ({request.instrument_type}).")
             except Exception as train_e:
                 raise HTTPException(status_code=500, detail=f"Failed to train model for prediction: {train_e}")
 
-        model = LSTMModel(input_size, hidden_size, num_layers, output_size, dropout)
-        model.load_state_dict(torch.load(model_path))
-        model.eval()
-
-        # Load the saved scaler
-        scaler = joblib.load(scaler_path)
+        # Load the model and its scaler (served from the in-process cache after the first call)
+        model, scaler = await _load_model(request.symbol, request.instrument_type, model_path, scaler_path, model_config)
 
         # Fetch recent historical data for prediction input
         end_date = date.today()
         # Fetch enough data to form the initial sequence
         initial_start_date = end_date - timedelta(days=sequence_length * 2) # Fetch enough data for robustness
-        historical_data = fetch_historical_price_data(request.symbol, request.instrument_type, initial_start_date, end_date)
+        historical_data = await fetch_historical_price_data(request.symbol, request.instrument_type, initial_start_date, end_date)
         
         if not historical_data:
             raise HTTPException(status_code=400, detail="Not enough historical data to make a prediction.")
 
-        df = pd.DataFrame(historical_data)
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
         # Use 'close' price for prediction
-        price_data = df['close'].values.reshape(-1, 1)
+        price_data = extract_column(historical_data, 'close').reshape(-1, 1)
 
         # Use the loaded scaler to transform the historical input
         scaled_price_data = scaler.transform(price_data)
@@ -344,24 +628,20 @@ async def predict_price(request: PredictionRequest):
         if len(scaled_price_data) < sequence_length:
             raise HTTPException(status_code=400, detail="Not enough historical data to form initial sequence for prediction.")
 
-        # Initialize the input sequence for multi-step prediction
-        current_sequence = torch.tensor(scaled_price_data[-sequence_length:], dtype=torch.float32).unsqueeze(0) # (1, sequence_length, 1)
-        
-        predictions = []
-
-        for _ in range(request.prediction_length):
-            with torch.no_grad():
-                # Make a single step prediction
-                predicted_scaled_value = model(current_sequence).squeeze(0).cpu().numpy()
-                print(f"Predicted scaled value: {predicted_scaled_value}")
-            # Append the new prediction to the input sequence and remove the oldest value
-            # The new input sequence will be (sequence_length-1) old values + 1 new prediction
-            current_sequence = torch.cat((current_sequence[:, 1:, :], torch.tensor(predicted_scaled_value, dtype=torch.float32).reshape(1, 1, 1)), dim=1)
-            predictions.append(predicted_scaled_value.item())
-
-        # Inverse transform all collected predictions
-        predicted_prices = scaler.inverse_transform(np.array(predictions).reshape(-1, 1)).flatten().tolist()
-        print(f"Predicted prices: {predicted_prices}")
+        # Rolling window for multi-step prediction: the history followed by a slot for every predicted step.
+        # Step i reads window[i:i + sequence_length] and writes its prediction to window[sequence_length + i],
+        # so the input sequence is always (sequence_length-1) old values + 1 new prediction without re-concatenating
+        window = torch.empty(sequence_length + request.prediction_length, 1, dtype=torch.float32)
+        window[:sequence_length] = torch.from_numpy(np.ascontiguousarray(scaled_price_data[-sequence_length:], dtype=np.float32))
+        model_key = (request.instrument_type, request.symbol)
+
+        for step in range(request.prediction_length):
+            # Make a single step prediction, batched with any concurrent requests for the same model
+            predicted_scaled_value = await predict_batcher.submit(model_key, model, window[step:step + sequence_length])
+            window[sequence_length + step] = predicted_scaled_value
+
+        # Inverse transform all collected predictions in one vectorized pass
+        predicted_prices = scaler.inverse_transform(window[sequence_length:].numpy()).flatten().tolist()
         return {"predicted_prices": predicted_prices}
 
     except Exception as e:
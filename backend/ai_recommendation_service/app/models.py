@@ -1,9 +1,8 @@
 import uuid
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from typing import List, Optional
 
-from pydantic import BaseModel, EmailStr
-import torch
+from pydantic import BaseModel, EmailStr, Field
 import torch.nn as nn
 
 # Pydantic models for inter-service communication (simplified versions of other services' public models)
@@ -48,7 +47,7 @@ class Recommendation(BaseModel):
     recommendation_type: str  # e.g., "buy", "hold", "sell"
     strength: float  # e.g., 0.0 to 1.0
     reason: str
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 # Generic message
 class Message(BaseModel):
@@ -63,9 +62,7 @@ class LSTMModel(nn.Module):
         self.fc = nn.Linear(hidden_size, output_size)
 
     def forward(self, x):
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
-
-        out, _ = self.lstm(x, (h0, c0))
+        # nn.LSTM zero-initializes the hidden and cell states itself when none are passed
+        out, _ = self.lstm(x)
         out = self.fc(out[:, -1, :])
         return out 
\ No newline at end of file
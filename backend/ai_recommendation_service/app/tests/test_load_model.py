@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import torch
+
+from app import main
+from app.data_processing import FastMinMaxScaler
+from app.models import LSTMModel
+
+MODEL_CONFIG = {
+    "input_size": 1,
+    "hidden_size": 8,
+    "num_layers": 2,
+    "output_size": 1,
+    "dropout": 0.0,
+}
+
+
+def save_checkpoint(directory: Path, symbol: str) -> tuple[LSTMModel, str, str]:
+    torch.manual_seed(0)
+    model = LSTMModel(**MODEL_CONFIG).eval()
+    model_path = str(directory / f"{symbol}_lstm_model.pth")
+    scaler_path = str(directory / f"{symbol}_scaler.npz")
+    torch.save(model.state_dict(), model_path)
+    scaler = FastMinMaxScaler()
+    scaler.fit(np.array([[1.0], [2.0]]))
+    scaler.save(scaler_path)
+    return model, model_path, scaler_path
+
+
+def load(
+    symbol: str, model_path: str, scaler_path: str
+) -> tuple[Any, FastMinMaxScaler]:
+    return asyncio.run(
+        main._load_model(symbol, "test", model_path, scaler_path, MODEL_CONFIG)
+    )
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_load_model_matches_eager_model(tmp_path: Path, quantize: bool) -> None:
+    symbol = f"LOAD_{quantize}"
+    eager, model_path, scaler_path = save_checkpoint(tmp_path, symbol)
+    with patch.object(main, "QUANTIZE_PREDICT_MODELS", quantize):
+        model, scaler = load(symbol, model_path, scaler_path)
+
+    batch = torch.rand(3, 5, 1)
+    with torch.inference_mode():
+        expected = eager(batch)
+        actual = model(batch)
+    assert actual.shape == (3, 1)
+    # int8 weights only approximate the float model
+    torch.testing.assert_close(
+        actual, expected, atol=0.05 if quantize else 1e-5, rtol=0
+    )
+    assert isinstance(scaler, FastMinMaxScaler)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_load_model_serves_eager_module_when_scripting_fails(
+    tmp_path: Path, quantize: bool
+) -> None:
+    symbol = f"EAGER_{quantize}"
+    _, model_path, scaler_path = save_checkpoint(tmp_path, symbol)
+    with (
+        patch.object(main, "QUANTIZE_PREDICT_MODELS", quantize),
+        patch.object(torch.jit, "script", side_effect=RuntimeError("unsupported")),
+    ):
+        model, _ = load(symbol, model_path, scaler_path)
+
+    assert not isinstance(model, torch.jit.ScriptModule)
+    with torch.inference_mode():
+        assert model(torch.rand(3, 5, 1)).shape == (3, 1)
@@ -0,0 +1,88 @@
+import asyncio
+from collections.abc import Generator
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app import main
+from app.ttl_cache import TTLCache
+
+PRICE = {"currency": "USD", "price": 100.0, "timestamp": "2024-01-01T00:00:00Z"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_state() -> Generator[None, None, None]:
+    with (
+        patch.object(main, "_market_data_cache", TTLCache(maxsize=2, ttl=60)),
+        patch.dict(main._market_data_locks, clear=True),
+        patch.object(main, "_market_data_batch_unavailable_until", 0.0),
+    ):
+        yield
+
+
+def serve(transport: httpx.MockTransport) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=transport)
+
+
+def per_symbol_only(requests: list[str]) -> httpx.MockTransport:
+    """An older market data service: the batched endpoint 404s."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path == "/market-data/current":
+            return httpx.Response(404)
+        symbol = request.url.path.rsplit("/", 1)[1]
+        return httpx.Response(200, json={"symbol": symbol, **PRICE})
+
+    return httpx.MockTransport(handler)
+
+
+def test_single_flight_locks_are_dropped_after_the_fetch() -> None:
+    requests: list[str] = []
+
+    async def run() -> None:
+        async with serve(per_symbol_only(requests)) as client:
+            with patch.object(main, "http_client", client):
+                results = await asyncio.gather(
+                    *[main.fetch_market_data("AAPL") for _ in range(5)]
+                )
+        assert all(r is not None and r.symbol == "AAPL" for r in results)
+
+    asyncio.run(run())
+    assert requests == ["/market-data/current/AAPL"]
+    assert main._market_data_locks == {}
+
+
+def test_cache_is_bounded() -> None:
+    async def run() -> None:
+        async with serve(per_symbol_only([])) as client:
+            with patch.object(main, "http_client", client):
+                for symbol in ("AAPL", "MSFT", "GOOGL"):
+                    await main.fetch_market_data(symbol)
+
+    asyncio.run(run())
+    assert len(main._market_data_cache) == 2
+
+
+def test_missing_batch_endpoint_is_probed_again_later() -> None:
+    requests: list[str] = []
+
+    async def fetch(symbol: str) -> None:
+        main._market_data_cache.pop(symbol)
+        async with serve(per_symbol_only(requests)) as client:
+            with patch.object(main, "http_client", client):
+                assert symbol in await main.fetch_market_data_batch([symbol])
+
+    asyncio.run(fetch("AAPL"))
+    asyncio.run(fetch("AAPL"))
+    # The second call went straight to the per-symbol endpoint
+    assert requests == [
+        "/market-data/current",
+        "/market-data/current/AAPL",
+        "/market-data/current/AAPL",
+    ]
+
+    main._market_data_batch_unavailable_until = 0.0  # The reprobe interval has passed
+    asyncio.run(fetch("AAPL"))
+    assert requests[3] == "/market-data/current"
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+import torch
+
+from app.main import PredictBatcher
+
+
+class RowSums:
+    """Stand-in model: one output per batch row, recording the batch sizes it was called with."""
+
+    def __init__(self) -> None:
+        self.batch_sizes: list[int] = []
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        self.batch_sizes.append(len(batch))
+        return batch.sum(dim=(1, 2)).unsqueeze(1)
+
+
+def test_concurrent_submits_share_one_forward_and_get_their_own_rows() -> None:
+    model = RowSums()
+
+    async def run() -> list[torch.Tensor]:
+        batcher = PredictBatcher(max_wait=0.01)
+        sequences = [torch.full((4, 1), float(i)) for i in range(5)]
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(("stock", "AAPL"), model, s) for s in sequences)
+            )
+        finally:
+            await batcher.close()
+
+    results = asyncio.run(run())
+    assert [r.item() for r in results] == [0.0, 4.0, 8.0, 12.0, 16.0]
+    assert model.batch_sizes == [5]
+
+
+def test_entries_for_different_models_are_not_mixed() -> None:
+    old_model, new_model = RowSums(), RowSums()
+
+    async def run() -> list[torch.Tensor]:
+        batcher = PredictBatcher(max_wait=0.01)
+        key = ("stock", "AAPL")
+        try:
+            return await asyncio.gather(
+                batcher.submit(key, old_model, torch.ones(4, 1)),
+                batcher.submit(key, new_model, torch.ones(4, 1)),
+                batcher.submit(key, old_model, torch.ones(4, 1)),
+            )
+        finally:
+            await batcher.close()
+
+    assert [r.item() for r in asyncio.run(run())] == [4.0, 4.0, 4.0]
+    assert old_model.batch_sizes == [2]
+    assert new_model.batch_sizes == [1]
+
+
+def test_forward_error_reaches_every_waiting_request() -> None:
+    def broken(_: torch.Tensor) -> torch.Tensor:
+        raise RuntimeError("forward failed")
+
+    async def run() -> None:
+        batcher = PredictBatcher(max_wait=0.01)
+        try:
+            await asyncio.gather(
+                batcher.submit(("stock", "AAPL"), broken, torch.ones(4, 1)),
+                batcher.submit(("stock", "AAPL"), broken, torch.ones(4, 1)),
+            )
+        finally:
+            await batcher.close()
+
+    with pytest.raises(RuntimeError, match="forward failed"):
+        asyncio.run(run())
+
+
+def test_idle_worker_exits_and_restarts_on_demand() -> None:
+    model = RowSums()
+    key = ("stock", "AAPL")
+
+    async def run() -> None:
+        batcher = PredictBatcher(max_wait=0, idle_timeout=0.01)
+        await batcher.submit(key, model, torch.ones(4, 1))
+        await asyncio.sleep(0.1)
+        assert key not in batcher._workers
+        assert key not in batcher._queues
+
+        result = await batcher.submit(key, model, torch.ones(4, 1))
+        assert result.item() == 4.0
+        await batcher.close()
+
+    asyncio.run(run())
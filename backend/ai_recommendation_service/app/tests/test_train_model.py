@@ -0,0 +1,63 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from app import main
+from app.data_processing import FastMinMaxScaler
+
+HISTORY = [
+    {"date": f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}", "close": 100.0 + i % 7}
+    for i in range(80)
+]
+
+
+def train(directory: Path, only_if_missing: bool = False) -> Any:
+    return main._train_model(
+        "TRAIN",
+        "forex",
+        learning_rate=0.001,
+        num_epochs=1,
+        model_save_directory=str(directory),
+        only_if_missing=only_if_missing,
+    )
+
+
+def test_concurrent_trainings_of_one_model_are_serialized(tmp_path: Path) -> None:
+    async def run() -> None:
+        await asyncio.gather(train(tmp_path), train(tmp_path))
+
+    fetch = AsyncMock(return_value=HISTORY)
+    # Locks are bound to the event loop they were first used on, and each test runs its own
+    with (
+        patch.object(main, "fetch_historical_price_data", fetch),
+        patch.dict(main._TRAINING_LOCKS, clear=True),
+    ):
+        asyncio.run(run())
+
+    assert fetch.await_count == 2
+    model_path, scaler_path = main._model_paths(str(tmp_path), "forex", "TRAIN")
+    # Both files are complete and no temp files are left behind
+    assert sorted(p.name for p in (tmp_path / "forex").iterdir()) == [
+        "TRAIN_lstm_model.pth",
+        "TRAIN_scaler.npz",
+    ]
+    assert FastMinMaxScaler.load(scaler_path).data_min == 100.0
+    main.torch.load(model_path, weights_only=True)
+
+
+def test_auto_training_skips_a_model_trained_while_waiting(tmp_path: Path) -> None:
+    async def run() -> None:
+        await asyncio.gather(
+            train(tmp_path, only_if_missing=True), train(tmp_path, only_if_missing=True)
+        )
+
+    fetch = AsyncMock(return_value=HISTORY)
+    # Locks are bound to the event loop they were first used on, and each test runs its own
+    with (
+        patch.object(main, "fetch_historical_price_data", fetch),
+        patch.dict(main._TRAINING_LOCKS, clear=True),
+    ):
+        asyncio.run(run())
+
+    assert fetch.await_count == 1
@@ -1,96 +1,224 @@
 # ai_recommendation_service.py
 
 from fastapi import FastAPI, HTTPException, Depends, Header
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
 from typing import List, Dict, Optional
 import httpx
 import asyncio
 import json
+import time
+from datetime import datetime
+from .schemas import CustomerPublic, Portfolio, PortfolioHolding, PriceData, Recommendation
+from .ttl_cache import TTLCache
 
 # --- External Service URLs ---
 CUSTOMER_SERVICE_URL = "http://localhost:8001"
 PORTFOLIO_SERVICE_URL = "http://localhost:8002"
 MARKET_DATA_SERVICE_URL = "http://localhost:8000"
 
-# --- Pydantic Models (for inter-service communication and API responses) ---
-class Recommendation(BaseModel):
-    user_id: str
-    asset_symbol: str
-    recommendation_type: str # e.g., "buy", "hold", "sell"
-    strength: float # e.g., 0.0 to 1.0
-    reason: str
-    timestamp: datetime = datetime.now()
-
-class PortfolioHolding(BaseModel): # Re-define from portfolio_service for clarity
-    symbol: str
-    quantity: float
-    average_cost: float
-    last_updated: datetime
-
-class Portfolio(BaseModel): # Re-define from portfolio_service for clarity
-    user_id: str
-    holdings: List[PortfolioHolding]
-    total_value: Optional[float] = None
-
-class CustomerPublic(BaseModel): # Re-define from customer_service for clarity
-    id: str
-    username: str
-    email: str
-    risk_appetite: str
-
-class PriceData(BaseModel): # Re-define from market_data_service for clarity
-    symbol: str
-    price: float
-    currency: str
-    timestamp: datetime
+# --- Downstream Timeouts (seconds) ---
+# Per-phase limits for each downstream HTTP call, set just above the observed p95 so a stalled service fails fast
+HTTP_TIMEOUTS = {
+    "connect": 1.0,
+    "read": 2.0,
+    "write": 2.0,
+    "pool": 1.0,
+}
+# Overall budget for gathering everything a recommendation needs
+RECOMMENDATION_FETCH_TIMEOUT = 3.0
+
+# Cap on concurrent per-symbol market data requests, so a large portfolio can't flood the Market Data Service
+MARKET_DATA_CONCURRENCY = 10
+_market_data_semaphore = asyncio.Semaphore(MARKET_DATA_CONCURRENCY)
+
+# Symbols always priced for recommendations, regardless of holdings
+_DEFAULT_SYMBOLS = frozenset({"AAPL", "GOOGL", "MSFT", "BTC", "ETH"})
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="AI Recommendation Service",
-    description="Analyzes user data and market data to provide investment recommendations."
+    description="Analyzes user data and market data to provide investment recommendations.",
+    default_response_class=ORJSONResponse,
 )
 
+# --- Shared HTTP client, created once per process and reused for every downstream call ---
+@app.on_event("startup")
+async def startup_event():
+    # Keep enough idle connections around (and for long enough) that a full recommendation fan-out
+    # never has to open new sockets between requests
+    app.state.http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=30, max_connections=100, keepalive_expiry=30.0),
+        timeout=httpx.Timeout(**HTTP_TIMEOUTS)
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await app.state.http_client.aclose()
+    print("AI Recommendation Service shutting down.")
+
 # --- Dependencies for Authorization (Simplified) ---
 async def get_current_user_id(x_user_id: str = Header(..., alias="X-User-ID")):
     if not x_user_id:
         raise HTTPException(status_code=401, detail="X-User-ID header missing")
     return x_user_id
 
-# --- Helper function to fetch data from other services ---
-async def fetch_user_data(user_id: str, auth_header: Dict[str, str]) -> CustomerPublic:
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{CUSTOMER_SERVICE_URL}/customers/{user_id}", headers=auth_header)
-            response.raise_for_status()
-            return CustomerPublic(**response.json())
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Customer Service error: {e.response.text}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=500, detail=f"Network error with Customer Service: {e}")
+# --- Circuit Breakers for downstream services ---
+class CircuitOpenError(Exception):
+    pass
 
-async def fetch_portfolio_data(user_id: str, auth_header: Dict[str, str]) -> Portfolio:
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{PORTFOLIO_SERVICE_URL}/portfolio/{user_id}", headers=auth_header)
-            response.raise_for_status()
-            return Portfolio(**response.json())
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Portfolio Service error: {e.response.text}")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=500, detail=f"Network error with Portfolio Service: {e}")
+class CircuitBreaker:
+    """
+    Minimal consecutive-failure circuit breaker. After `failure_threshold` failures in a row the circuit opens
+    and calls fail immediately. Once `recovery_timeout` seconds pass it is half-open: a single trial call is let
+    through while the rest keep failing fast, and its outcome closes the circuit or opens it for another period.
+    Only network errors, timeouts and 5xx responses count as failures.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 15.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
 
-async def fetch_market_data(symbol: str) -> PriceData:
-    async with httpx.AsyncClient() as client:
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        trial = self.opened_at is not None
+        if trial:
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.recovery_timeout:
+                raise CircuitOpenError(self.name)
+            self.trial_in_flight = True
         try:
-            response = await client.get(f"{MARKET_DATA_SERVICE_URL}/market-data/current/{symbol}")
+            response = await client.request(method, url, **kwargs)
             response.raise_for_status()
-            return PriceData(**response.json())
         except httpx.HTTPStatusError as e:
-            print(f"Warning: Could not fetch market data for {symbol}: {e.response.text}")
-            return None # Or handle more robustly
-        except httpx.RequestError as e:
-            print(f"Warning: Network error fetching market data for {symbol}: {e}")
-            return None
+            if e.response.status_code >= 500:
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except httpx.RequestError:
+            self.record_failure()
+            raise
+        finally:
+            if trial: # Also on cancellation, so an abandoned trial doesn't keep the circuit shut
+                self.trial_in_flight = False
+        self.record_success()
+        return response
+
+customer_breaker = CircuitBreaker("Customer Service")
+portfolio_breaker = CircuitBreaker("Portfolio Service")
+market_data_breaker = CircuitBreaker("Market Data Service")
+
+# Last portfolio successfully fetched per user, served while the Portfolio Service circuit is open
+LAST_KNOWN_PORTFOLIO_TTL = 3600.0 # seconds; older portfolios aren't worth serving
+LAST_KNOWN_PORTFOLIO_MAXSIZE = 10000
+_last_known_portfolios: TTLCache[Portfolio] = TTLCache(maxsize=LAST_KNOWN_PORTFOLIO_MAXSIZE, ttl=LAST_KNOWN_PORTFOLIO_TTL)
+
+# --- Trusted payload construction ---
+# Trust boundary: these payloads come from our own sibling services, which already validated them against the
+# shared schemas before responding, so they are rebuilt with model_construct instead of being validated again.
+# Only datetimes need parsing back from their ISO strings.
+def _parse_datetime(value: str) -> datetime:
+    # fromisoformat only accepts a "Z" suffix from Python 3.11 on
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+def _customer_from_payload(data: dict) -> CustomerPublic:
+    return CustomerPublic.model_construct(**data)
+
+def _portfolio_from_payload(data: dict) -> Portfolio:
+    holdings = [
+        PortfolioHolding.model_construct(
+            symbol=h["symbol"], quantity=h["quantity"], average_cost=h["average_cost"],
+            last_updated=_parse_datetime(h["last_updated"]),
+        )
+        for h in data["holdings"]
+    ]
+    return Portfolio.model_construct(user_id=data["user_id"], holdings=holdings, total_value=data.get("total_value"))
+
+def _price_from_payload(md: dict) -> PriceData:
+    return PriceData.model_construct(
+        symbol=md["symbol"], price=md["price"], currency=md["currency"],
+        timestamp=_parse_datetime(md["timestamp"]),
+    )
+
+# --- Helper function to fetch data from other services ---
+async def fetch_user_data(client: httpx.AsyncClient, user_id: str, auth_header: Dict[str, str]) -> CustomerPublic:
+    try:
+        response = await customer_breaker.request(client, "GET", f"{CUSTOMER_SERVICE_URL}/customers/{user_id}", headers=auth_header)
+        return _customer_from_payload(response.json())
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Customer Service unavailable")
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Customer Service timed out")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Customer Service error: {e.response.text}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Network error with Customer Service: {e}")
+
+async def fetch_portfolio_data(client: httpx.AsyncClient, user_id: str, auth_header: Dict[str, str]) -> Portfolio:
+    try:
+        response = await portfolio_breaker.request(client, "GET", f"{PORTFOLIO_SERVICE_URL}/portfolio/{user_id}", headers=auth_header)
+        portfolio = _portfolio_from_payload(response.json())
+        _last_known_portfolios.set(user_id, portfolio)
+        return portfolio
+    except CircuitOpenError:
+        last_known = _last_known_portfolios.get(user_id)
+        if last_known is not None:
+            print(f"Warning: Portfolio Service circuit open, serving last known portfolio for {user_id}")
+            return last_known
+        raise HTTPException(status_code=503, detail="Portfolio Service unavailable")
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Portfolio Service timed out")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"Portfolio Service error: {e.response.text}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Network error with Portfolio Service: {e}")
+
+async def fetch_market_data(client: httpx.AsyncClient, symbol: str) -> PriceData:
+    try:
+        response = await market_data_breaker.request(client, "GET", f"{MARKET_DATA_SERVICE_URL}/market-data/current/{symbol}")
+        return _price_from_payload(response.json())
+    except CircuitOpenError:
+        return None
+    except httpx.HTTPStatusError as e:
+        print(f"Warning: Could not fetch market data for {symbol}: {e.response.text}")
+        return None # Or handle more robustly
+    except httpx.RequestError as e:
+        print(f"Warning: Network error fetching market data for {symbol}: {e}")
+        return None
+
+async def fetch_market_data_bounded(client: httpx.AsyncClient, symbol: str) -> PriceData:
+    async with _market_data_semaphore:
+        return await fetch_market_data(client, symbol)
+
+async def fetch_market_data_batch(client: httpx.AsyncClient, symbols: List[str]) -> List[PriceData]:
+    """Fetches current prices for all symbols in one request, falling back to per-symbol calls if unsupported."""
+    try:
+        response = await market_data_breaker.request(client, "POST", f"{MARKET_DATA_SERVICE_URL}/market-data/current", json={"symbols": symbols})
+        return [_price_from_payload(md) for md in response.json()]
+    except CircuitOpenError:
+        return []
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (404, 405): # Older Market Data Service without the batch endpoint
+            # return_exceptions so one unexpected failure doesn't cancel the other lookups
+            results = await asyncio.gather(*[fetch_market_data_bounded(client, s) for s in symbols], return_exceptions=True)
+            return [md for md in results if isinstance(md, PriceData)]
+        print(f"Warning: Could not fetch market data for {symbols}: {e.response.text}")
+        return []
+    except httpx.RequestError as e:
+        print(f"Warning: Network error fetching market data for {symbols}: {e}")
+        return []
 
 # --- Mock ML/Recommendation Logic (Replace with actual ML model) ---
 async def generate_mock_recommendations(
@@ -159,19 +287,31 @@ async def get_recommendations_for_user(user_id: str, current_user_id: str = Depe
 
     auth_header = {"X-User-ID": user_id}
 
-    # Fetch necessary data from other services
-    user_data = await fetch_user_data(user_id, auth_header)
-    portfolio_data = await fetch_portfolio_data(user_id, auth_header)
+    client = app.state.http_client
+
+    async def fetch_inputs():
+        # Fetch user data, portfolio data and market data for the general-interest symbols concurrently;
+        # only the symbols specific to the user's holdings have to wait for the portfolio
+        user_data, portfolio_data, market_data_results = await asyncio.gather(
+            fetch_user_data(client, user_id, auth_header),
+            fetch_portfolio_data(client, user_id, auth_header),
+            fetch_market_data_batch(client, list(_DEFAULT_SYMBOLS))
+        )
+
+        # Fetch market data for held symbols not already covered
+        holding_symbols = {h.symbol for h in portfolio_data.holdings} - _DEFAULT_SYMBOLS
+        if holding_symbols:
+            market_data_results += await fetch_market_data_batch(client, list(holding_symbols))
+        return user_data, portfolio_data, market_data_results
 
-    # Fetch market data for relevant symbols (e.g., from portfolio, or general interest)
-    symbols_to_fetch = set([h.symbol for h in portfolio_data.holdings] + ["AAPL", "GOOGL", "MSFT", "BTC", "ETH"]) # Example symbols
-    market_data_tasks = [fetch_market_data(s) for s in symbols_to_fetch]
-    market_data_results = await asyncio.gather(*market_data_tasks)
+    # Bound the whole fan-out so a stalled downstream service returns a 504 instead of tying up the worker
+    try:
+        user_data, portfolio_data, market_data_results = await asyncio.wait_for(fetch_inputs(), RECOMMENDATION_FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out fetching data for recommendations.")
 
-    # Convert list of PriceData (some might be None) to a dictionary for easy lookup
-    current_market_prices = {
-        md.symbol: md for md in market_data_results if md is not None
-    }
+    # Convert list of PriceData to a dictionary for easy lookup
+    current_market_prices = {md.symbol: md for md in market_data_results}
 
     # Generate recommendations using mock ML logic
     recommendations = await generate_mock_recommendations(
@@ -184,4 +324,4 @@ async def get_recommendations_for_user(user_id: str, current_user_id: str = Depe
     return recommendations
 
 # To run this:
-# uvicorn ai_recommendation_service:app --port 8005 --reload
+# uvicorn app.api.routes.new_routes.ai_recommendation_service:app --port 8005 --reload
@@ -0,0 +1,238 @@
+# portfolio_consumer.py
+# Applies transaction events from Kafka to holdings. Runs as its own process, so draining the topic never
+# competes with portfolio reads for the HTTP service's event loop; run one replica per topic partition at most.
+
+from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import orjson
+import os
+from datetime import datetime
+from aiokafka import AIOKafkaConsumer
+from aiokafka.errors import KafkaError
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlmodel import Session, select
+from .portfolio_db import DBHolding, create_db_and_tables, engine
+
+# --- Pydantic Models (Event Schemas) ---
+# Define Transaction model for Kafka consumer to validate incoming data
+class Transaction(BaseModel):
+    transaction_id: str
+    user_id: str
+    type: str
+    symbol: Optional[str] = None
+    quantity: Optional[float] = None
+    amount: float
+    timestamp: datetime
+
+# --- Kafka Consumer Setup ---
+KAFKA_BOOTSTRAP_SERVERS = 'localhost:9092'
+TRANSACTION_EVENTS_TOPIC = "transaction_events"
+KAFKA_CONSUMER_GROUP_ID = "portfolio_service_group"
+# Fetch sizing: wait for a reasonably full fetch instead of returning on the first record, to amortize broker round-trips
+KAFKA_FETCH_MIN_BYTES = int(os.getenv("KAFKA_FETCH_MIN_BYTES", "65536"))
+KAFKA_FETCH_MAX_WAIT_MS = int(os.getenv("KAFKA_FETCH_MAX_WAIT_MS", "500"))
+KAFKA_MAX_PARTITION_FETCH_BYTES = int(os.getenv("KAFKA_MAX_PARTITION_FETCH_BYTES", str(5 * 1024 * 1024)))
+
+# --- Transaction Processing ---
+def parse_transaction_event(value: bytes) -> Optional[Transaction]:
+    """Returns the completed transaction carried by an event, or None for events that don't affect holdings."""
+    event_data = orjson.loads(value)
+    event_type = event_data.get("event_type")
+    transaction_data = event_data.get("transaction_data")
+
+    if event_type == "transaction_completed" and transaction_data:
+        if isinstance(transaction_data, str): # Events published before transaction_data was nested as an object
+            return Transaction.model_validate_json(transaction_data)
+        return Transaction.model_validate(transaction_data)
+    print(f"Unknown or incomplete event type: {event_type}")
+    return None
+
+def apply_transactions(db: Session, transactions: List[Transaction]):
+    """
+    Applies transactions to holdings, in order. Every holding the batch touches is loaded with a single query
+    and updated in memory, so the caller can commit the whole batch at once.
+    """
+    keys = {(t.user_id, t.symbol.upper()) for t in transactions if t.symbol}
+    if not keys:
+        return
+
+    statement = select(DBHolding).where(
+        DBHolding.user_id.in_({user_id for user_id, _ in keys}),
+        DBHolding.symbol.in_({symbol for _, symbol in keys}) # Symbols are stored upper-case, so this can use the index
+    )
+    holdings = {(h.user_id, h.symbol): h for h in db.exec(statement)}
+    now = datetime.now() # One timestamp for every holding the batch touches
+
+    for transaction in transactions:
+        print(f"Processing transaction for user: {transaction.user_id}, type: {transaction.type}")
+        if not (transaction.symbol and transaction.quantity):
+            continue
+        key = (transaction.user_id, transaction.symbol.upper())
+        db_holding = holdings.get(key)
+
+        if transaction.type == "buy":
+            if not db_holding:
+                # Create new holding
+                price_per_unit = transaction.amount / transaction.quantity if transaction.quantity else 0
+                new_holding = DBHolding(
+                    user_id=transaction.user_id,
+                    symbol=transaction.symbol.upper(), # Store symbol consistently
+                    quantity=transaction.quantity,
+                    average_cost=price_per_unit,
+                    last_updated=now
+                )
+                db.add(new_holding)
+                holdings[key] = new_holding
+                print(f"New holding created for {transaction.user_id}: {transaction.quantity} of {transaction.symbol}")
+            else:
+                # Update existing holding
+                total_qty = db_holding.quantity + transaction.quantity
+                if total_qty > 0:
+                    db_holding.average_cost = (
+                        (db_holding.quantity * db_holding.average_cost) +
+                        (transaction.quantity * (transaction.amount / transaction.quantity))
+                    ) / total_qty
+                db_holding.quantity = total_qty
+                db_holding.last_updated = now
+                db.add(db_holding) # Add back to session for update
+                print(f"Holding updated for {transaction.user_id}: Added {transaction.quantity} of {transaction.symbol}")
+
+        elif transaction.type == "sell":
+            if db_holding:
+                if db_holding.quantity >= transaction.quantity:
+                    db_holding.quantity -= transaction.quantity
+                    if db_holding.quantity == 0:
+                        # Remove if quantity is zero; a holding created earlier in this batch was never written
+                        if db_holding in db.new:
+                            db.expunge(db_holding)
+                        else:
+                            db.delete(db_holding)
+                        del holdings[key]
+                        print(f"Holding deleted for {transaction.user_id}: {transaction.symbol}")
+                    else:
+                        db_holding.last_updated = now
+                        db.add(db_holding) # Add back to session for update
+                        print(f"Holding updated for {transaction.user_id}: Sold {transaction.quantity} of {transaction.symbol}")
+                else:
+                    print(f"Warning: Attempted to sell more {transaction.symbol} than available for {transaction.user_id}")
+            else:
+                print(f"Warning: No holding found for {transaction.symbol} to sell for {transaction.user_id}")
+
+def is_transient_db_error(error: Exception) -> bool:
+    """True for errors meaning the database couldn't be reached, as opposed to it rejecting a transaction."""
+    return isinstance(error, (OperationalError, InterfaceError)) or (
+        isinstance(error, DBAPIError) and error.connection_invalidated
+    )
+
+def apply_batch(db: Session, transactions: List[Transaction]) -> bool:
+    """
+    Applies and commits a batch of transactions. If the batch fails, it's retried one transaction at a time,
+    each inside a savepoint, so a transaction the database rejects is logged and skipped without holding back
+    the rest. Returns False if the database couldn't be reached or the final commit failed; nothing is committed
+    then, and the caller must not commit the batch's offsets.
+    """
+    try:
+        try:
+            apply_transactions(db, transactions)
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            if is_transient_db_error(e):
+                print(f"Database unavailable, batch of {len(transactions)} transactions will be retried: {e}")
+                return False
+            print(f"Error applying batch of {len(transactions)} transactions, retrying individually: {e}")
+
+        for transaction in transactions:
+            try:
+                with db.begin_nested():
+                    apply_transactions(db, [transaction])
+            except Exception as e:
+                if is_transient_db_error(e):
+                    db.rollback()
+                    print(f"Database unavailable, batch of {len(transactions)} transactions will be retried: {e}")
+                    return False
+                print(f"Error processing transaction {transaction.transaction_id}, skipping it: {e}")
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error committing batch of {len(transactions)} transactions, it will be retried: {e}")
+            return False
+        return True
+    finally:
+        db.expunge_all() # Keep the long-lived session's identity map from growing across batches
+
+# --- Consumer Loop Function ---
+KAFKA_BATCH_MAX_RECORDS = int(os.getenv("KAFKA_MAX_POLL_RECORDS", "500")) # Messages applied per DB transaction / offset commit
+KAFKA_BATCH_TIMEOUT_MS = 500
+DB_UNAVAILABLE_BACKOFF_SECONDS = 5.0 # Pause before re-reading a batch the database couldn't take
+
+async def consume_messages():
+    consumer = AIOKafkaConsumer(
+        TRANSACTION_EVENTS_TOPIC,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        group_id=KAFKA_CONSUMER_GROUP_ID,
+        auto_offset_reset='earliest',
+        fetch_min_bytes=KAFKA_FETCH_MIN_BYTES,
+        fetch_max_wait_ms=KAFKA_FETCH_MAX_WAIT_MS,
+        max_partition_fetch_bytes=KAFKA_MAX_PARTITION_FETCH_BYTES,
+        max_poll_records=KAFKA_BATCH_MAX_RECORDS,
+        enable_auto_commit=False # Offsets are committed once each batch has been applied
+    )
+
+    db = None
+    print(f"Starting Kafka consumer for topic '{TRANSACTION_EVENTS_TOPIC}'...")
+    try:
+        await consumer.start()
+        print("Kafka Consumer started successfully.")
+        db = Session(engine) # One session for the consumer's lifetime, reused by every batch
+        while True:
+            batches = await consumer.getmany(timeout_ms=KAFKA_BATCH_TIMEOUT_MS, max_records=KAFKA_BATCH_MAX_RECORDS)
+            messages = [msg for partition_messages in batches.values() for msg in partition_messages]
+            if not messages:
+                continue
+            print(f"Consumed {len(messages)} messages from topic {TRANSACTION_EVENTS_TOPIC}")
+
+            transactions = []
+            for msg in messages:
+                try:
+                    transaction = parse_transaction_event(msg.value)
+                    if transaction:
+                        transactions.append(transaction)
+                except orjson.JSONDecodeError:
+                    print(f"Could not decode JSON from message value: {msg.value}")
+                except Exception as e:
+                    print(f"Error parsing Kafka message at offset {msg.offset}: {e}")
+
+            if apply_batch(db, transactions):
+                try:
+                    await consumer.commit()
+                except KafkaError as e:
+                    # e.g. a rebalance moved the partitions away; their new owner resumes from the last commit
+                    print(f"Error committing offsets, continuing: {e}")
+            else:
+                # Rewind to the start of the batch so it's redelivered once the database is reachable again
+                for tp, partition_messages in batches.items():
+                    consumer.seek(tp, partition_messages[0].offset)
+                await asyncio.sleep(DB_UNAVAILABLE_BACKOFF_SECONDS)
+
+    except Exception as e:
+        print(f"Kafka consumer error: {e}")
+    finally:
+        if db:
+            db.close()
+        if consumer:
+            await consumer.stop()
+            print("Kafka Consumer stopped.")
+
+async def run():
+    create_db_and_tables() # Don't depend on the HTTP service having started first
+    await consume_messages()
+
+if __name__ == "__main__":
+    asyncio.run(run())
+
+# To run this from backend/ (alongside the HTTP service, uvicorn app.api.routes.new_routes.porfolio_service:app):
+# python -m app.api.routes.new_routes.portfolio_consumer
@@ -0,0 +1,37 @@
+# schemas.py
+# Response schemas shared between the services, so callers and providers agree on one definition.
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime, timezone
+
+class CustomerPublic(BaseModel): # Served by customer_service
+    id: str
+    username: str
+    email: str
+    risk_appetite: str
+
+class PortfolioHolding(BaseModel): # Served by porfolio_service
+    symbol: str
+    quantity: float
+    average_cost: float
+    last_updated: datetime
+
+class Portfolio(BaseModel): # Served by porfolio_service
+    user_id: str
+    holdings: List[PortfolioHolding]
+    total_value: Optional[float] = None
+
+class PriceData(BaseModel): # Served by market_data_service
+    symbol: str
+    price: float
+    currency: str
+    timestamp: datetime
+
+class Recommendation(BaseModel): # Served by ai_recommendation_service
+    user_id: str
+    asset_symbol: str
+    recommendation_type: str # e.g., "buy", "hold", "sell"
+    strength: float # e.g., 0.0 to 1.0
+    reason: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.api.routes.new_routes.ai_recommendation_service import (
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+URL = "http://downstream/resource"
+
+
+def open_breaker(recovery_timeout: float) -> CircuitBreaker:
+    breaker = CircuitBreaker(
+        "Downstream", failure_threshold=2, recovery_timeout=recovery_timeout
+    )
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures() -> None:
+    async def run() -> None:
+        breaker = CircuitBreaker("Downstream", failure_threshold=2, recovery_timeout=60)
+        transport = httpx.MockTransport(lambda _: httpx.Response(503))
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(2):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await breaker.request(client, "GET", URL)
+            with pytest.raises(CircuitOpenError):
+                await breaker.request(client, "GET", URL)
+
+    asyncio.run(run())
+
+
+def test_half_open_breaker_lets_one_trial_call_through() -> None:
+    async def run() -> None:
+        breaker = open_breaker(recovery_timeout=0)
+        release = asyncio.Event()
+
+        async def slow_ok(_: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(slow_ok)) as client:
+            trial = asyncio.create_task(breaker.request(client, "GET", URL))
+            await asyncio.sleep(0)
+            with pytest.raises(CircuitOpenError):
+                await breaker.request(client, "GET", URL)
+
+            release.set()
+            assert (await trial).status_code == 200
+            # The successful trial closed the circuit
+            assert breaker.opened_at is None
+            assert (await breaker.request(client, "GET", URL)).status_code == 200
+
+    asyncio.run(run())
+
+
+def test_failed_trial_reopens_breaker() -> None:
+    async def run() -> None:
+        breaker = open_breaker(recovery_timeout=0)
+        transport = httpx.MockTransport(lambda _: httpx.Response(500))
+        async with httpx.AsyncClient(transport=transport) as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await breaker.request(client, "GET", URL)
+        assert breaker.opened_at is not None
+        assert not breaker.trial_in_flight
+
+        breaker.recovery_timeout = 60
+        async with httpx.AsyncClient(transport=transport) as client:
+            with pytest.raises(CircuitOpenError):
+                await breaker.request(client, "GET", URL)
+
+    asyncio.run(run())
+
+
+def test_cancelled_trial_releases_half_open_slot() -> None:
+    async def run() -> None:
+        breaker = open_breaker(recovery_timeout=0)
+
+        async def hang(_: httpx.Request) -> httpx.Response:
+            await asyncio.Event().wait()
+            raise AssertionError("unreachable")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(hang)) as client:
+            trial = asyncio.create_task(breaker.request(client, "GET", URL))
+            await asyncio.sleep(0)
+            assert breaker.trial_in_flight
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+        assert not breaker.trial_in_flight
+
+    asyncio.run(run())
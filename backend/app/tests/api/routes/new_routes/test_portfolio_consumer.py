@@ -0,0 +1,101 @@
+from collections.abc import Generator
+from datetime import datetime
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from app.api.routes.new_routes import portfolio_consumer
+from app.api.routes.new_routes.portfolio_consumer import Transaction, apply_batch
+from app.api.routes.new_routes.portfolio_db import DBHolding
+from app.tests.utils.db import scratch_schema
+
+
+@pytest.fixture()
+def holdings_db() -> Generator[Session, None, None]:
+    with scratch_schema(DBHolding.__table__) as engine, Session(engine) as session:
+        yield session
+
+
+def buy(transaction_id: str, symbol: str, quantity: float) -> Transaction:
+    return Transaction(
+        transaction_id=transaction_id,
+        user_id="user-1",
+        type="buy",
+        symbol=symbol,
+        quantity=quantity,
+        amount=quantity * 10,
+        timestamp=datetime.now(),
+    )
+
+
+def stored_holdings(db: Session) -> dict[str, float]:
+    return {h.symbol: h.quantity for h in db.exec(select(DBHolding))}
+
+
+def fail_on(transaction_id: str, error: Exception) -> Any:
+    """Wraps apply_transactions so any call that includes the given transaction raises."""
+    apply_transactions = portfolio_consumer.apply_transactions
+
+    def wrapper(db: Session, transactions: list[Transaction]) -> None:
+        if any(t.transaction_id == transaction_id for t in transactions):
+            raise error
+        apply_transactions(db, transactions)
+
+    return patch.object(portfolio_consumer, "apply_transactions", side_effect=wrapper)
+
+
+def connection_lost() -> OperationalError:
+    return OperationalError("SELECT 1", {}, Exception("server closed the connection"))
+
+
+def test_apply_batch_commits_every_transaction(holdings_db: Session) -> None:
+    assert apply_batch(holdings_db, [buy("t1", "aapl", 2), buy("t2", "AAPL", 3)])
+    assert stored_holdings(holdings_db) == {"AAPL": 5}
+
+
+def test_apply_batch_skips_rejected_transaction(holdings_db: Session) -> None:
+    transactions = [buy("t1", "AAPL", 2), buy("t2", "MSFT", 1), buy("t3", "BTC", 4)]
+    with fail_on("t2", ValueError("rejected")):
+        assert apply_batch(holdings_db, transactions)
+    assert stored_holdings(holdings_db) == {"AAPL": 2, "BTC": 4}
+
+
+def test_apply_batch_reports_unreachable_database(holdings_db: Session) -> None:
+    with fail_on("t1", connection_lost()):
+        assert not apply_batch(holdings_db, [buy("t1", "AAPL", 2)])
+    assert stored_holdings(holdings_db) == {}
+
+
+def test_apply_batch_reports_database_lost_during_retry(holdings_db: Session) -> None:
+    transactions = [buy("t1", "AAPL", 2), buy("t2", "MSFT", 1), buy("t3", "BTC", 4)]
+    apply_transactions = portfolio_consumer.apply_transactions
+    calls = 0
+
+    def flaky(db: Session, batch: list[Transaction]) -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ValueError(
+                "rejected"
+            )  # Whole batch fails, so it's retried individually
+        if batch[0].transaction_id == "t3":
+            raise connection_lost()
+        apply_transactions(db, batch)
+
+    with patch.object(portfolio_consumer, "apply_transactions", side_effect=flaky):
+        assert not apply_batch(holdings_db, transactions)
+    # Nothing is committed, so the whole batch can be redelivered
+    assert stored_holdings(holdings_db) == {}
+
+
+def test_apply_batch_reports_failed_retry_commit(holdings_db: Session) -> None:
+    transactions = [buy("t1", "AAPL", 2), buy("t2", "MSFT", 1)]
+    with (
+        fail_on("t2", ValueError("rejected")),
+        patch.object(holdings_db, "commit", side_effect=connection_lost()),
+    ):
+        assert not apply_batch(holdings_db, transactions)
+    assert stored_holdings(holdings_db) == {}
@@ -0,0 +1,58 @@
+from collections.abc import Generator
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session, select
+
+from app.api.routes.new_routes import portfolio_db
+from app.api.routes.new_routes.portfolio_db import DBHolding, normalize_holding_symbols
+from app.tests.utils.db import scratch_schema
+
+
+@pytest.fixture()
+def holdings_db() -> Generator[Session, None, None]:
+    with (
+        scratch_schema(DBHolding.__table__) as engine,
+        patch.object(portfolio_db, "engine", engine),
+        Session(engine) as session,
+    ):
+        yield session
+
+
+def holding(
+    user_id: str, symbol: str, quantity: float, average_cost: float
+) -> DBHolding:
+    return DBHolding(
+        user_id=user_id,
+        symbol=symbol,
+        quantity=quantity,
+        average_cost=average_cost,
+        last_updated=datetime(2024, 1, 1),
+    )
+
+
+def test_normalize_merges_case_duplicates(holdings_db: Session) -> None:
+    holdings_db.add_all(
+        [
+            holding("user-1", "AAPL", 10, 100),
+            holding("user-1", "aapl", 30, 200),
+            holding("user-1", "Aapl", 10, 300),
+            holding("user-2", "aapl", 5, 50),
+            holding("user-2", "MSFT", 1, 10),
+        ]
+    )
+    holdings_db.commit()
+
+    normalize_holding_symbols()
+
+    holdings_db.expire_all()
+    stored = {
+        (h.user_id, h.symbol): (h.quantity, h.average_cost)
+        for h in holdings_db.exec(select(DBHolding))
+    }
+    assert stored == {
+        ("user-1", "AAPL"): (50, 200),
+        ("user-2", "AAPL"): (5, 50),
+        ("user-2", "MSFT"): (1, 10),
+    }
@@ -0,0 +1,57 @@
+import asyncio
+from collections.abc import Generator
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.api.routes.new_routes import transaction_service
+from app.api.routes.new_routes.transaction_service import (
+    DBTransaction,
+    TransactionCreate,
+    create_transaction,
+)
+from app.tests.utils.db import scratch_schema
+
+
+@pytest.fixture()
+def transactions_db() -> Generator[Session, None, None]:
+    with scratch_schema(DBTransaction.__table__) as engine, Session(engine) as session:
+        yield session
+
+
+def post(db: Session, transaction_id: str, **overrides: object) -> DBTransaction:
+    fields = {
+        "transaction_id": transaction_id,
+        "user_id": "user-1",
+        "type": "buy",
+        "amount": 10.0,
+    }
+    transaction = TransactionCreate(**{**fields, **overrides})
+    with patch.object(transaction_service, "producer", AsyncMock()):
+        return asyncio.run(create_transaction(transaction, db))
+
+
+def test_duplicate_transaction_id_is_rejected(transactions_db: Session) -> None:
+    post(transactions_db, "tx-1")
+    with pytest.raises(HTTPException) as exc:
+        post(transactions_db, "tx-1")
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Transaction ID already exists."
+
+
+def test_other_constraint_violations_are_not_reported_as_duplicates(
+    transactions_db: Session,
+) -> None:
+    transactions_db.execute(
+        text(
+            "ALTER TABLE transactions ADD CONSTRAINT amount_positive CHECK (amount > 0)"
+        )
+    )
+    transactions_db.commit()
+    with pytest.raises(HTTPException) as exc:
+        post(transactions_db, "tx-1", amount=-5.0)
+    assert exc.value.status_code == 400
+    assert exc.value.detail != "Transaction ID already exists."
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from app.api.routes.new_routes import ttl_cache
+from app.api.routes.new_routes.ttl_cache import TTLCache
+
+
+def test_full_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_after_their_ttl() -> None:
+    cache: TTLCache[int] = TTLCache(maxsize=10, ttl=60)
+    with patch.object(ttl_cache.time, "monotonic", return_value=1000.0):
+        cache.set("default", 1)
+        cache.set("short", 2, ttl=5)
+    with patch.object(ttl_cache.time, "monotonic", return_value=1010.0):
+        assert cache.get("default") == 1
+        assert cache.get("short") is None
+    with patch.object(ttl_cache.time, "monotonic", return_value=1060.0):
+        assert cache.get("default") is None
+    assert len(cache) == 0
+
+
+def test_pop_drops_entry() -> None:
+    cache: TTLCache[int] = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
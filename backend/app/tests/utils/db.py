@@ -0,0 +1,31 @@
+import uuid
+from collections.abc import Generator
+from contextlib import contextmanager
+
+from sqlalchemy import Engine, Table, text
+from sqlmodel import create_engine
+
+from app.core.db import engine
+
+
+@contextmanager
+def scratch_schema(*tables: Table) -> Generator[Engine, None, None]:
+    """
+    Yields an engine whose search_path is a new, empty schema holding `tables`.
+    Tests can create and drop tables there without touching same-named tables
+    in the test database; the schema is dropped afterwards.
+    """
+    schema = f"test_{uuid.uuid4().hex}"
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    scratch_engine = create_engine(
+        engine.url, connect_args={"options": f"-csearch_path={schema}"}
+    )
+    try:
+        for table in tables:
+            table.create(scratch_engine)
+        yield scratch_engine
+    finally:
+        scratch_engine.dispose()
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
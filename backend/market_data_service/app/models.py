@@ -2,6 +2,8 @@ import uuid
 from datetime import datetime, date
 from typing import List, Optional, Annotated
 
+import uuid6
+from sqlalchemy import Column, DateTime, UniqueConstraint, func
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -12,20 +14,23 @@ class DBPriceData(SQLModel, table=True):
     instrument_type: str = Field(index=True)
     price: float
     currency: str
-    timestamp: datetime = Field(default_factory=datetime.now)
+    # Set to the fetch time of each quote batch, which is also returned to callers; Postgres fills it in otherwise
+    timestamp: datetime = Field(sa_column=Column(DateTime, nullable=False, server_default=func.now()))
 
 class DBHistoricalPricePoint(SQLModel, table=True):
     __tablename__ = "historical_price_points"
+    # One price point per symbol/type/date; also the conflict target for historical upserts
+    __table_args__ = (UniqueConstraint("symbol", "instrument_type", "date", name="uq_historical_symbol_type_date"),)
 
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    symbol: str = Field(index=True)
+    id: uuid.UUID = Field(default_factory=uuid6.uuid7, primary_key=True)
+    symbol: str # Leading column of uq_historical_symbol_type_date, which also serves symbol lookups
     instrument_type: str = Field(index=True)
     date: datetime
     open: float
     high: float
     low: float
     close: float
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime, nullable=False, server_default=func.now())) # Stamped by Postgres
 
 class HistoricalPricePointBase(SQLModel):
     date: datetime
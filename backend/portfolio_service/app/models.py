@@ -3,6 +3,8 @@ from datetime import datetime
 from typing import List, Optional
 from enum import Enum
 
+import uuid6
+from sqlalchemy import Column, DateTime, UniqueConstraint, func
 from sqlmodel import Field, SQLModel, Relationship
 
 class InstrumentType(str, Enum):
@@ -16,20 +18,28 @@ class InstrumentType(str, Enum):
 # Minimal User model for relationship, actual user data resides in User Service
 class User(SQLModel, table=True):
     __tablename__ = "users"
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    holdings: List["DBHolding"] = Relationship(back_populates="user")
+    id: uuid.UUID = Field(default_factory=uuid6.uuid7, primary_key=True)
+    # Lazy loads raise instead of issuing a query per parent row; load holdings explicitly (select or selectinload)
+    holdings: List["DBHolding"] = Relationship(back_populates="user", sa_relationship_kwargs={"lazy": "raise"})
 
 class DBHolding(SQLModel, table=True):
     __tablename__ = "holdings"
+    # One holding per symbol and instrument type per user (a stock and a fund can share a ticker). The constraint's
+    # index also serves per-user reads (user_id prefix) and the user_id + symbol lookups
+    __table_args__ = (UniqueConstraint("user_id", "symbol", "instrument_type", name="uq_holding_user_symbol_type"),)
 
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    user_id: uuid.UUID = Field(index=True, nullable=False, foreign_key="users.id")
+    id: uuid.UUID = Field(default_factory=uuid6.uuid7, primary_key=True)
+    user_id: uuid.UUID = Field(nullable=False, foreign_key="users.id")
     symbol: str = Field(index=True, nullable=False)
     instrument_type: InstrumentType = Field(nullable=False)
     quantity: float
     average_cost: float
-    last_updated: datetime = Field(default_factory=datetime.now)
-    user: User = Relationship(back_populates="holdings")
+    # Stamped by Postgres on insert and on every update
+    last_updated: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    )
+    user: User = Relationship(back_populates="holdings", sa_relationship_kwargs={"lazy": "raise"})
 
 
 # Pydantic models for API responses
@@ -3,13 +3,16 @@ from datetime import datetime
 from typing import Literal, List, Optional
 from enum import Enum
 
+import uuid6
+from sqlalchemy import Column, DateTime, Index, func
 from sqlmodel import Field, SQLModel, Relationship
 
 # Minimal User model for relationship, actual user data resides in User Service
 class User(SQLModel, table=True):
     __tablename__ = "users"
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    transactions: List["DBTransaction"] = Relationship(back_populates="user")
+    id: uuid.UUID = Field(default_factory=uuid6.uuid7, primary_key=True)
+    # Lazy loads raise instead of issuing a query per parent row; load transactions explicitly (select or selectinload)
+    transactions: List["DBTransaction"] = Relationship(back_populates="user", sa_relationship_kwargs={"lazy": "raise"})
 
 class TransactionType(str, Enum):
     BUY = "buy"
@@ -17,15 +20,17 @@ class TransactionType(str, Enum):
 
 class DBTransaction(SQLModel, table=True):
     __tablename__ = "transactions"
+    # A user's transactions in (timestamp, id) order; serves the keyset pagination in get_user_transactions
+    __table_args__ = (Index("ix_transactions_user_ts_id", "user_id", "timestamp", "id"),)
 
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    user_id: uuid.UUID = Field(index=True, nullable=False, foreign_key="users.id")
+    id: uuid.UUID = Field(default_factory=uuid6.uuid7, primary_key=True)
+    user_id: uuid.UUID = Field(nullable=False, foreign_key="users.id")
     symbol: str = Field(index=True, nullable=False)
     quantity: float
     price: float
     transaction_type: TransactionType
-    timestamp: datetime = Field(default_factory=datetime.now)
-    user: User = Relationship(back_populates="transactions")
+    timestamp: Optional[datetime] = Field(default=None, sa_column=Column(DateTime, nullable=False, server_default=func.now())) # Stamped by Postgres
+    user: User = Relationship(back_populates="transactions", sa_relationship_kwargs={"lazy": "raise"})
 
 # Pydantic models for API interactions
 class TransactionCreate(SQLModel):
@@ -41,8 +46,10 @@ class TransactionPublic(TransactionCreate):
 
 class UserTransactionsPublic(SQLModel):
     user_id: uuid.UUID
-    transactions: List[TransactionPublic]
-    count: int
+    transactions: List[TransactionPublic] # Newest first
+    # Pass as `before` and `before_id` for the next page; both None on the last page
+    next_cursor: Optional[datetime] = None
+    next_cursor_id: Optional[uuid.UUID] = None
 
 # Generic message
 class Message(SQLModel):
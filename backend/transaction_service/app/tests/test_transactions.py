@@ -0,0 +1,105 @@
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, delete
+
+from app.main import DATABASE_URL, app
+from app.models import DBTransaction, TransactionType, User
+
+sync_engine = create_engine(DATABASE_URL)
+
+
+@pytest.fixture(scope="module")
+def client() -> Generator[TestClient, None, None]:
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture()
+def user_transactions() -> Generator[tuple[uuid.UUID, list[uuid.UUID]], None, None]:
+    """Five transactions for a new user, newest first; the middle three share one timestamp."""
+    SQLModel.metadata.create_all(sync_engine)
+    user_id = uuid.uuid4()
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    timestamps = (
+        [start + timedelta(minutes=2)] + [start + timedelta(minutes=1)] * 3 + [start]
+    )
+    transactions = [
+        DBTransaction(
+            user_id=user_id,
+            symbol="AAPL",
+            quantity=1,
+            price=100,
+            transaction_type=TransactionType.BUY,
+            timestamp=timestamp,
+        )
+        for timestamp in timestamps
+    ]
+    # Newest first, ties broken by id descending, as the endpoint returns them
+    expected = [
+        t.id
+        for t in sorted(transactions, key=lambda t: (t.timestamp, t.id), reverse=True)
+    ]
+    with Session(sync_engine) as session:
+        session.add(User(id=user_id))
+        session.commit()
+        session.add_all(transactions)
+        session.commit()
+    yield user_id, expected
+    with Session(sync_engine) as session:
+        session.exec(delete(DBTransaction).where(DBTransaction.user_id == user_id))
+        session.exec(delete(User).where(User.id == user_id))
+        session.commit()
+
+
+def test_pages_cover_tied_timestamps_exactly_once(
+    client: TestClient, user_transactions: tuple[uuid.UUID, list[uuid.UUID]]
+) -> None:
+    user_id, expected = user_transactions
+    headers = {"X-User-ID": str(user_id)}
+    params: dict[str, str | int] = {"limit": 2}
+    seen: list[uuid.UUID] = []
+    while True:
+        r = client.get(f"/transactions/{user_id}", headers=headers, params=params)
+        assert r.status_code == 200
+        page = r.json()
+        seen += [uuid.UUID(t["id"]) for t in page["transactions"]]
+        if page["next_cursor"] is None:
+            assert page["next_cursor_id"] is None
+            break
+        params = {
+            "limit": 2,
+            "before": page["next_cursor"],
+            "before_id": page["next_cursor_id"],
+        }
+    assert seen == expected
+
+
+def test_full_last_page_returns_cursor_to_an_empty_page(
+    client: TestClient, user_transactions: tuple[uuid.UUID, list[uuid.UUID]]
+) -> None:
+    user_id, expected = user_transactions
+    headers = {"X-User-ID": str(user_id)}
+    r = client.get(f"/transactions/{user_id}", headers=headers, params={"limit": 5})
+    page = r.json()
+    assert [uuid.UUID(t["id"]) for t in page["transactions"]] == expected
+    assert uuid.UUID(page["next_cursor_id"]) == expected[-1]
+
+    params = {
+        "limit": 5,
+        "before": page["next_cursor"],
+        "before_id": page["next_cursor_id"],
+    }
+    r = client.get(f"/transactions/{user_id}", headers=headers, params=params)
+    assert r.json()["transactions"] == []
+    assert r.json()["next_cursor"] is None
+
+
+def test_other_users_transactions_are_forbidden(client: TestClient) -> None:
+    r = client.get(
+        f"/transactions/{uuid.uuid4()}", headers={"X-User-ID": str(uuid.uuid4())}
+    )
+    assert r.status_code == 403
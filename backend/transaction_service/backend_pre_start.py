@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 
@@ -5,6 +6,8 @@ from sqlalchemy import create_engine
 from sqlmodel import Session, select
 from tenacity import after_log, before_log, retry, stop_after_attempt, wait_fixed
 
+from app.main import create_db_and_tables, engine as app_engine
+
 logging.basicConfig(level=logging.DEBUG, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -32,9 +35,15 @@ def init_db() -> None:
         logger.error(f"Database connection failed: {e}")
         raise e
 
+async def create_schema() -> None:
+    await create_db_and_tables()
+    await app_engine.dispose()
+
 def main() -> None:
     logger.info("Initializing Transaction Service...")
     init_db()
+    # Once per deploy, here rather than in the app's startup hook, so uvicorn workers don't each run the DDL
+    asyncio.run(create_schema())
     logger.info("Transaction Service database initialized.")
 
 
@@ -0,0 +1,59 @@
+# cache.py
+# Redis cache-aside helpers. Kept byte-identical in user_service/app/cache.py and portfolio_service/app/cache.py;
+# change both together.
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+# Unset REDIS_URL to run without a cache; Redis errors are logged and fall through to the DB
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_REFILL_LOCK_TTL = 5 # seconds; bounds how long a crashed refiller can hold the lock
+CACHE_REFILL_WAIT = 0.05 # seconds between re-checks while another request refills a key
+CACHE_REFILL_MAX_WAITS = 10
+
+redis_client: Optional[redis.Redis] = redis.from_url(REDIS_URL) if REDIS_URL else None
+
+async def cache_aside(key: str, ttl: int, load: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+    """
+    Returns the JSON cached under key, or the JSON produced by load(), which is then cached for ttl seconds.
+    None from load() (not found) is not cached. Only one request per key refills it at a time
+    (SET NX lock); the others wait briefly for its result rather than all querying the DB at once.
+    """
+    if redis_client is None:
+        return await load()
+    lock_key = f"{key}:lock"
+    try:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return cached.decode()
+        if not await redis_client.set(lock_key, 1, nx=True, ex=CACHE_REFILL_LOCK_TTL):
+            for _ in range(CACHE_REFILL_MAX_WAITS):
+                await asyncio.sleep(CACHE_REFILL_WAIT)
+                cached = await redis_client.get(key)
+                if cached is not None:
+                    return cached.decode()
+            lock_key = None # Not ours; the DB serves this request
+    except RedisError as e:
+        print(f"Redis unavailable, reading {key} from the DB: {e}")
+        return await load()
+
+    value = await load()
+    try:
+        if value is not None:
+            await redis_client.set(key, value, ex=ttl)
+        if lock_key:
+            await redis_client.delete(lock_key)
+    except RedisError as e:
+        print(f"Could not cache {key}: {e}")
+    return value
+
+async def cache_invalidate(key: str):
+    if redis_client is None:
+        return
+    try:
+        await redis_client.delete(key)
+    except RedisError as e:
+        print(f"Could not invalidate {key}: {e}")
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 
+import uuid6
 from pydantic import EmailStr
 from sqlmodel import Field, Relationship, SQLModel
 
@@ -46,7 +47,7 @@ class UpdatePassword(SQLModel):
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
     __tablename__ = "users"
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: uuid.UUID = Field(default_factory=uuid6.uuid7, primary_key=True)
     hashed_password: str
     # Removed relationships to other services as they will be separate
 
@@ -0,0 +1,103 @@
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app import cache
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for cache_aside: get, set (with nx) and delete."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def set(
+        self, key: str, value: Any, nx: bool = False, ex: int | None = None
+    ) -> bool:  # noqa: ARG002
+        if nx and key in self.data:
+            return False
+        self.data[key] = str(value).encode()
+        return True
+
+    async def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+class BrokenRedis(FakeRedis):
+    async def get(self, key: str) -> bytes | None:  # noqa: ARG002
+        raise RedisConnectionError("connection refused")
+
+
+class Loader:
+    def __init__(self, value: str | None) -> None:
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self) -> str | None:
+        self.calls += 1
+        return self.value
+
+
+def test_cache_aside_serves_cached_value_until_invalidated() -> None:
+    fake = FakeRedis()
+    load = Loader('{"id": 1}')
+
+    async def run() -> None:
+        assert await cache.cache_aside("user:1:profile", 60, load) == '{"id": 1}'
+        assert await cache.cache_aside("user:1:profile", 60, load) == '{"id": 1}'
+        assert load.calls == 1
+        assert "user:1:profile:lock" not in fake.data
+
+        await cache.cache_invalidate("user:1:profile")
+        load.value = '{"id": 1, "full_name": "New"}'
+        assert await cache.cache_aside("user:1:profile", 60, load) == load.value
+        assert load.calls == 2
+
+    with patch.object(cache, "redis_client", fake):
+        asyncio.run(run())
+
+
+def test_cache_aside_does_not_cache_missing_values() -> None:
+    fake = FakeRedis()
+    load = Loader(None)
+
+    async def run() -> None:
+        assert await cache.cache_aside("user:2:profile", 60, load) is None
+        assert await cache.cache_aside("user:2:profile", 60, load) is None
+
+    with patch.object(cache, "redis_client", fake):
+        asyncio.run(run())
+    assert load.calls == 2
+    assert fake.data == {}
+
+
+def test_cache_aside_waits_for_concurrent_refill() -> None:
+    fake = FakeRedis()
+    fake.data["user:3:profile:lock"] = b"1"  # Another request is refilling the key
+    load = Loader('{"id": 3}')
+
+    async def refill() -> None:
+        await asyncio.sleep(cache.CACHE_REFILL_WAIT)
+        fake.data["user:3:profile"] = b'{"id": 3}'
+
+    async def run() -> str | None:
+        value, _ = await asyncio.gather(
+            cache.cache_aside("user:3:profile", 60, load), refill()
+        )
+        return value
+
+    with patch.object(cache, "redis_client", fake):
+        assert asyncio.run(run()) == '{"id": 3}'
+    assert load.calls == 0
+
+
+def test_cache_aside_falls_back_to_load_when_redis_is_down() -> None:
+    load = Loader('{"id": 4}')
+    with patch.object(cache, "redis_client", BrokenRedis()):
+        assert asyncio.run(cache.cache_aside("user:4:profile", 60, load)) == '{"id": 4}'
+    assert load.calls == 1